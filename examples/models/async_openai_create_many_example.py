@@ -0,0 +1,28 @@
+import asyncio
+import os
+
+from openai import AsyncOpenAI
+
+from observers import wrap_openai
+
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+client = wrap_openai(openai_client)
+
+
+async def get_responses() -> None:
+    responses = await client.create_many(
+        [
+            [{"role": "user", "content": "Tell me a joke."}],
+            [{"role": "user", "content": "Tell me a riddle."}],
+            [{"role": "user", "content": "Tell me a fun fact."}],
+        ],
+        model="gpt-4o",
+        concurrency=2,
+    )
+    for response in responses:
+        print(response.choices[0].message.content)
+
+
+if __name__ == "__main__":
+    asyncio.run(get_responses())
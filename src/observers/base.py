@@ -1,13 +1,22 @@
-import uuid
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Literal, Optional, Union
 from typing_extensions import Literal
 
 if TYPE_CHECKING:
     from argilla import Argilla
 
 
+def generate_id() -> str:
+    """Generate a random UUID4 string without building a `uuid.UUID` object"""
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
 @dataclass
 class Function:
     """Function tool call information"""
@@ -40,18 +49,18 @@ class Message:
     """
 
 
-@dataclass
+@dataclass(slots=True)
 class Record(ABC):
     """
     Base class for storing model response information
     """
 
-    client_name: str = field(init=False)
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: ClassVar[str]
+    id: str = field(default_factory=generate_id)
     tags: List[str] = None
     properties: Dict[str, Any] = None
     error: Optional[str] = None
-    raw_response: Optional[Dict] = None
+    raw_response: Optional[Union[Dict, str]] = None
 
     @property
     @abstractmethod
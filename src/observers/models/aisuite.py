@@ -15,6 +15,7 @@ if TYPE_CHECKING:
 
 
 class AisuiteRecord(OpenAIRecord):
+    __slots__ = ()
     client_name: str = "aisuite"
 
 
@@ -24,6 +25,8 @@ def wrap_aisuite(
     tags: Optional[List[str]] = None,
     properties: Optional[Dict[str, Any]] = None,
     logging_rate: Optional[float] = 1,
+    batch_size: Optional[int] = 1,
+    flush_interval: Optional[float] = 5,
 ) -> Union[AsyncChatCompletionObserver, ChatCompletionObserver]:
     """Wraps Aisuite client to track API calls in a Store.
 
@@ -38,6 +41,10 @@ def wrap_aisuite(
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store, defaults to 1
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered, defaults to 5
 
     Returns:
         `ChatCompletionObserver`:
@@ -46,10 +53,12 @@ def wrap_aisuite(
     return ChatCompletionObserver(
         client=client,
         create=client.chat.completions.create,
-        format_input=lambda messages, **kwargs: kwargs | {"messages": messages},
+        format_input=None,
         parse_response=AisuiteRecord.from_response,
         store=store,
         tags=tags,
         properties=properties,
         logging_rate=logging_rate,
+        batch_size=batch_size,
+        flush_interval=flush_interval,
     )
@@ -1,11 +1,25 @@
+import asyncio
 import datetime
+import hashlib
+import logging
 import random
+import threading
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
-
-from typing_extensions import Self
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Union,
+)
+
+import orjson
 
 from observers.base import Message, Record
+from observers.stores.base import JSON_OPTIONS
 from observers.stores.datasets import DatasetsStore
 
 if TYPE_CHECKING:
@@ -14,14 +28,29 @@ if TYPE_CHECKING:
     from observers.stores.duckdb import DuckDBStore
 
 
-@dataclass
+_CLIENT_ATTRIBUTES = (
+    "models",
+    "files",
+    "images",
+    "audio",
+    "embeddings",
+    "beta",
+    "moderations",
+)
+# kwargs that are stored in their own columns rather than in `arguments`
+_EXCLUDED_ARGUMENTS = frozenset({"model", "messages", "tags", "properties"})
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
 class ChatCompletionRecord(Record):
     """
     Data class for storing chat completion records.
     """
 
     model: str = None
-    timestamp: str = field(default_factory=lambda: datetime.datetime.now().isoformat())
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)
     arguments: Optional[Dict[str, Any]] = None
 
     messages: List[Message] = None
@@ -187,8 +216,9 @@ class ChatCompletionObserver:
             The client to use for the chat completions.
         create (`Callable[..., Any]`):
             The function to use to create the chat completions., eg `chat.completions.create` for OpenAI client.
-        format_input (`Callable[[Dict[str, Any], Any], Any]`):
-            The function to use to format the input messages.
+        format_input (`Callable[[Dict[str, Any], Any], Any]`, *optional*):
+            The function to use to format the input messages. If `None`, the messages
+            are passed to the create function as the `messages` keyword argument.
         parse_response (`Callable[[Any], Dict[str, Any]]`):
             The function to use to parse the response.
         store (`Union["DuckDBStore", DatasetsStore]`, *optional*):
@@ -199,41 +229,64 @@ class ChatCompletionObserver:
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store in a
+            single batch, defaults to 1 (write every record immediately)
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered before they are
+            written to the store when `batch_size` > 1, defaults to 5. `None` only
+            writes full batches, on `flush`/`close` and at interpreter exit.
+        cache (`MutableMapping[str, Any]`, *optional*):
+            A mapping used to cache non-streaming responses by request content, e.g.
+            a `dict` or a `diskcache.Cache`. Cache hits skip the API call and are not
+            logged.
     """
 
     def __init__(
         self,
         client: Any,
         create: Callable[..., Any],
-        format_input: Callable[[Dict[str, Any], Any], Any],
+        format_input: Optional[Callable[[Dict[str, Any], Any], Any]],
         parse_response: Callable[[Any], Dict[str, Any]],
         store: Optional[Union["DuckDBStore", DatasetsStore]] = None,
         tags: Optional[List[str]] = None,
         properties: Optional[Dict[str, Any]] = None,
         logging_rate: Optional[float] = 1,
+        batch_size: Optional[int] = 1,
+        flush_interval: Optional[float] = 5,
+        cache: Optional[MutableMapping[str, Any]] = None,
         **kwargs: Any,
     ):
         self.client = client
         self.create_fn = create
         self.format_input = format_input
         self.parse_response = parse_response
+        # only a store created here is closed along with the observer
+        self._owns_store = store is None
         self.store = store or DatasetsStore.connect()
         self.tags = tags or []
         self.properties = properties or {}
         self.kwargs = kwargs
         self.logging_rate = logging_rate
-
-    @property
-    def chat(self) -> Self:
-        return self
-
-    @property
-    def completions(self) -> Self:
-        return self
-
-    def _log_record(
+        self.batch_size = batch_size or 1
+        self.flush_interval = flush_interval
+        self.cache = cache
+        self._pending: List[Record] = []
+        self._pending_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+
+        # `client.chat.completions.create` resolves to the observer itself
+        self.chat = self
+        self.completions = self
+        # bind commonly used client resources so they skip `__getattr__`
+        for name in _CLIENT_ATTRIBUTES:
+            value = getattr(client, name, None)
+            if value is not None:
+                setattr(self, name, value)
+
+    def _parse_record(
         self, response, error=None, model=None, messages=None, arguments=None
-    ):
+    ) -> Record:
         record = self.parse_response(
             response,
             error=error,
@@ -243,10 +296,92 @@ class ChatCompletionObserver:
             properties=self.properties,
             arguments=arguments,
         )
+        return record
+
+    def _log_record(
+        self, response, error=None, model=None, messages=None, arguments=None
+    ):
+        record = self._parse_record(
+            response, error=error, model=model, messages=messages, arguments=arguments
+        )
         if random.random() < self.logging_rate:
-            self.store.add(record)
+            if self.batch_size > 1:
+                if self._buffer_record(record):
+                    self._try_flush()
+            else:
+                self.store.add(record)
         return record
 
+    def _buffer_record(self, record: Record) -> bool:
+        """Buffer a record, returning whether a full batch is buffered"""
+        with self._pending_lock:
+            if not self._pending:
+                # the store flushes its producers before closing and at exit
+                self.store.register_producer(self)
+                self._start_flush_timer()
+            self._pending.append(record)
+            return len(self._pending) >= self.batch_size
+
+    def _start_flush_timer(self) -> None:
+        """Schedule a flush of the buffered records after `flush_interval` seconds"""
+        if self.flush_interval and self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self._try_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _take_pending(self) -> List[Record]:
+        """Take the buffered records out of the buffer"""
+        with self._pending_lock:
+            records, self._pending = self._pending, []
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            return records
+
+    def _restore_pending(self, records: List[Record]) -> None:
+        """Put records that could not be written back in front of the buffer"""
+        with self._pending_lock:
+            self._pending[:0] = records
+            self._start_flush_timer()
+
+    def _release_producer(self) -> None:
+        """Unregister from the store once no records are buffered"""
+        with self._pending_lock:
+            if not self._pending:
+                self.store.unregister_producer(self)
+
+    def _try_flush(self) -> None:
+        """Flush the buffered records, logging failures instead of raising them so
+        they do not surface in an unrelated request, the records are retried later"""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to write buffered records to the store")
+
+    def flush(self) -> None:
+        """Write all buffered records to the store, keeping them if the write fails"""
+        records = self._take_pending()
+        if records:
+            try:
+                self.store.add_many(records)
+            except Exception:
+                self._restore_pending(records)
+                raise
+            self._release_producer()
+
+    def close(self) -> None:
+        """Write the buffered records and close the store if the observer created it.
+        A store or client passed in by the caller is left open"""
+        self.flush()
+        if self._owns_store:
+            self.store.close()
+
+    def __enter__(self) -> "ChatCompletionObserver":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
     def create(
         self,
         messages: Dict[str, Any],
@@ -267,17 +402,15 @@ class ChatCompletionObserver:
         """
         response = None
         kwargs = self.handle_kwargs(kwargs)
-        excluded_args = {"model", "messages", "tags", "properties"}
-        arguments = {k: v for k, v in kwargs.items() if k not in excluded_args}
+        arguments = {k: v for k, v in kwargs.items() if k not in _EXCLUDED_ARGUMENTS}
         model = kwargs.get("model")
-        input_data = self.format_input(messages, **kwargs)
 
         if kwargs.get("stream", False):
 
             def stream_responses():
                 response_buffer = []
                 try:
-                    for chunk in self.create_fn(**input_data):
+                    for chunk in self._call_create(messages, kwargs):
                         yield chunk
                         response_buffer.append(chunk)
                     self._log_record(
@@ -298,11 +431,20 @@ class ChatCompletionObserver:
 
             return stream_responses()
 
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(messages, kwargs)
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+
         try:
-            response = self.create_fn(**input_data)
+            response = self._call_create(messages, kwargs)
             self._log_record(
                 response, model=model, messages=messages, arguments=arguments
             )
+            if cache_key is not None:
+                self.cache[cache_key] = response
             return response
         except Exception as e:
             self._log_record(
@@ -310,6 +452,19 @@ class ChatCompletionObserver:
             )
             raise
 
+    def _call_create(self, messages: Dict[str, Any], kwargs: Dict[str, Any]) -> Any:
+        """Call the create function with the messages and keyword arguments"""
+        if self.format_input is None:
+            return self.create_fn(messages=messages, **kwargs)
+        return self.create_fn(**self.format_input(messages, **kwargs))
+
+    def _cache_key(self, messages: Dict[str, Any], kwargs: Dict[str, Any]) -> str:
+        """Compute a cache key from the canonicalized request content"""
+        payload = orjson.dumps(
+            [messages, kwargs], default=str, option=JSON_OPTIONS | orjson.OPT_SORT_KEYS
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
     def handle_kwargs(self, kwargs: dict[str, Any]) -> dict[str, Any]:
         """
         Handle and process keyword arguments for the API call.
@@ -333,8 +488,9 @@ class AsyncChatCompletionObserver(ChatCompletionObserver):
             The async client to use for the chat completions.
         create (`Callable[..., Awaitable[Any]]`):
             The async function to use to create the chat completions.
-        format_input (`Callable[[Dict[str, Any], Any], Any]`):
-            The function to use to format the input messages.
+        format_input (`Callable[[Dict[str, Any], Any], Any]`, *optional*):
+            The function to use to format the input messages. If `None`, the messages
+            are passed to the create function as the `messages` keyword argument.
         parse_response (`Callable[[Any], Dict[str, Any]]`):
             The function to use to parse the response.
         store (`Union["DuckDBStore", DatasetsStore]`, *optional*):
@@ -345,24 +501,53 @@ class AsyncChatCompletionObserver(ChatCompletionObserver):
             The properties to include in the records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store in a
+            single batch, defaults to 1 (write every record immediately)
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered before they are
+            written to the store when `batch_size` > 1, defaults to 5. `None` only
+            writes full batches, on `flush`/`close` and at interpreter exit.
+        cache (`MutableMapping[str, Any]`, *optional*):
+            A mapping used to cache non-streaming responses by request content, e.g.
+            a `dict` or a `diskcache.Cache`. Cache hits skip the API call and are not
+            logged.
     """
 
     async def _log_record_async(
         self, response, error=None, model=None, messages=None, arguments=None
     ):
-        record = self.parse_response(
-            response,
-            error=error,
-            model=model,
-            messages=messages,
-            tags=self.tags,
-            properties=self.properties,
-            arguments=arguments,
+        record = self._parse_record(
+            response, error=error, model=model, messages=messages, arguments=arguments
         )
         if random.random() < self.logging_rate:
-            await self.store.add_async(record)
+            if self.batch_size > 1:
+                if self._buffer_record(record):
+                    await self._try_flush_async()
+            else:
+                await self.store.add_async(record)
         return record
 
+    async def _try_flush_async(self) -> None:
+        """Flush the buffered records asynchronously, logging failures instead of
+        raising them, the records are retried later"""
+        try:
+            await self.flush_async()
+        except Exception:
+            logger.exception("Failed to write buffered records to the store")
+
+    async def flush_async(self) -> None:
+        """Write all buffered records to the store asynchronously, they stay buffered
+        if the write fails"""
+        records = self._take_pending()
+        if records:
+            try:
+                await self.store.add_many_async(records)
+            except Exception:
+                self._restore_pending(records)
+                raise
+            self._release_producer()
+
     async def create(
         self,
         messages: Dict[str, Any],
@@ -379,17 +564,15 @@ class AsyncChatCompletionObserver(ChatCompletionObserver):
         """
         response = None
         kwargs = self.handle_kwargs(kwargs)
-        excluded_args = {"model", "messages", "tags", "properties"}
-        arguments = {k: v for k, v in kwargs.items() if k not in excluded_args}
+        arguments = {k: v for k, v in kwargs.items() if k not in _EXCLUDED_ARGUMENTS}
         model = kwargs.get("model")
-        input_data = self.format_input(messages, **kwargs)
 
         if kwargs.get("stream", False):
 
             async def stream_responses():
                 response_buffer = []
                 try:
-                    async for chunk in await self.create_fn(**input_data):
+                    async for chunk in await self._call_create(messages, kwargs):
                         yield chunk
                         response_buffer.append(chunk)
                     await self._log_record_async(
@@ -410,11 +593,20 @@ class AsyncChatCompletionObserver(ChatCompletionObserver):
 
             return stream_responses()
 
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(messages, kwargs)
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+
         try:
-            response = await self.create_fn(**input_data)
+            response = await self._call_create(messages, kwargs)
             await self._log_record_async(
                 response, model=model, messages=messages, arguments=arguments
             )
+            if cache_key is not None:
+                self.cache[cache_key] = response
             return response
         except Exception as e:
             await self._log_record_async(
@@ -422,8 +614,107 @@ class AsyncChatCompletionObserver(ChatCompletionObserver):
             )
             raise
 
+    async def create_many(
+        self,
+        messages_list: List[Dict[str, Any]],
+        *,
+        concurrency: int = 32,
+        **kwargs: Any,
+    ) -> List[Any]:
+        """Create async completions for several conversations concurrently.
+
+        At most `concurrency` requests are in flight at once and the resulting records
+        are written to the store in a single batch. When the observer has a `cache`,
+        cached conversations skip the API call and duplicate conversations in the batch
+        are only sent once. For large offline workloads, the OpenAI Batch API
+        (`/v1/batches`) trades latency for higher throughput and cost.
+
+        Args:
+            messages_list (`List[Dict[str, Any]]`):
+                The messages of each conversation to send to the assistant.
+            concurrency (`int`, *optional*):
+                The maximum number of concurrent requests, at least 1, defaults to 32.
+            **kwargs:
+                Additional arguments passed to the create function for every request.
+                Streaming is not supported.
+        Returns:
+            List[Any]:
+                The responses from the assistant, in the order of `messages_list`.
+        """
+        if concurrency < 1:
+            raise ValueError(f"`concurrency` must be at least 1, got {concurrency}.")
+        kwargs = self.handle_kwargs(kwargs)
+        if kwargs.get("stream", False):
+            raise ValueError("Streaming is not supported by `create_many`.")
+        arguments = {k: v for k, v in kwargs.items() if k not in _EXCLUDED_ARGUMENTS}
+        model = kwargs.get("model")
+        semaphore = asyncio.Semaphore(concurrency)
+        records = []
+
+        async def create_one(messages, cache_key=None):
+            if cache_key is not None:
+                cached_response = self.cache.get(cache_key)
+                if cached_response is not None:
+                    return cached_response
+
+            async with semaphore:
+                try:
+                    response = await self._call_create(messages, kwargs)
+                except Exception as e:
+                    records.append(
+                        self._parse_record(
+                            None,
+                            error=e,
+                            model=model,
+                            messages=messages,
+                            arguments=arguments,
+                        )
+                    )
+                    raise
+                records.append(
+                    self._parse_record(
+                        response, model=model, messages=messages, arguments=arguments
+                    )
+                )
+                if cache_key is not None:
+                    self.cache[cache_key] = response
+                return response
+
+        # duplicate conversations share a single request when responses are cached
+        requests: Dict[str, asyncio.Future] = {}
+
+        def schedule(messages):
+            if self.cache is None:
+                return create_one(messages)
+            cache_key = self._cache_key(messages, kwargs)
+            if cache_key not in requests:
+                requests[cache_key] = asyncio.ensure_future(
+                    create_one(messages, cache_key)
+                )
+            return requests[cache_key]
+
+        responses = await asyncio.gather(
+            *(schedule(messages) for messages in messages_list),
+            return_exceptions=True,
+        )
+        sampled_records = [r for r in records if random.random() < self.logging_rate]
+        if sampled_records:
+            await self.store.add_many_async(sampled_records)
+
+        for response in responses:
+            if isinstance(response, BaseException):
+                raise response
+        return responses
+
     async def __aenter__(self) -> "AsyncChatCompletionObserver":
         return self
 
+    async def close_async(self) -> None:
+        """Write the buffered records asynchronously and close the store if the
+        observer created it. A store or client passed in by the caller is left open"""
+        await self.flush_async()
+        if self._owns_store:
+            await self.store.close_async()
+
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        await self.store.close_async()
+        await self.close_async()
@@ -1,9 +1,9 @@
-import uuid
 from dataclasses import asdict
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 from huggingface_hub import AsyncInferenceClient, InferenceClient
 
+from observers.base import generate_id
 from observers.models.base import (
     AsyncChatCompletionObserver,
     ChatCompletionObserver,
@@ -21,6 +21,7 @@ if TYPE_CHECKING:
 
 
 class HFRecord(ChatCompletionRecord):
+    __slots__ = ()
     client_name: str = "hf_client"
 
     @classmethod
@@ -46,13 +47,6 @@ class HFRecord(ChatCompletionRecord):
 
         # Handle streaming responses
         if isinstance(response, list):
-            first_dump = asdict(response[0])
-            last_dump = asdict(response[-1])
-            id = first_dump.get("id") or str(uuid.uuid4())
-
-            choices = last_dump.get("choices", [{}])[0]
-            delta = choices.get("delta", {})
-
             content = ""
             total_tokens = prompt_tokens = completion_tokens = 0
             raw_response = {}
@@ -60,13 +54,17 @@ class HFRecord(ChatCompletionRecord):
             for i, r in enumerate(response):
                 r_dump = asdict(r)
                 raw_response[i] = r_dump
-                usage = r_dump.get("usage", {})
+                usage = r_dump.get("usage") or {}
                 total_tokens += usage.get("total_tokens", 0)
                 prompt_tokens += usage.get("prompt_tokens", 0)
                 completion_tokens += usage.get("completion_tokens", 0)
-                content += (
-                    r_dump.get("choices", [{}])[0].get("delta", {}).get("content") or ""
-                )
+                r_choices = r_dump.get("choices")
+                if r_choices:
+                    content += (r_choices[0].get("delta") or {}).get("content") or ""
+
+            id = raw_response[0].get("id") or generate_id()
+            choice = (raw_response[len(response) - 1].get("choices") or [{}])[0]
+            delta = choice.get("delta") or {}
 
             return cls(
                 id=id,
@@ -74,7 +72,7 @@ class HFRecord(ChatCompletionRecord):
                 prompt_tokens=prompt_tokens,
                 total_tokens=total_tokens,
                 assistant_message=content,
-                finish_reason=choices.get("finish_reason"),
+                finish_reason=choice.get("finish_reason"),
                 tool_calls=delta.get("tool_calls"),
                 function_call=delta.get("function_call"),
                 raw_response=raw_response,
@@ -83,18 +81,19 @@ class HFRecord(ChatCompletionRecord):
 
         # Handle non-streaming responses
         response_dump = asdict(response)
-        choices = response_dump.get("choices", [{}])[0].get("message", {})
-        usage = response_dump.get("usage", {})
+        choice = (response_dump.get("choices") or [{}])[0]
+        message = choice.get("message") or {}
+        usage = response_dump.get("usage") or {}
 
         return cls(
-            id=response_dump.get("id") or str(uuid.uuid4()),
+            id=response_dump.get("id") or generate_id(),
             completion_tokens=usage.get("completion_tokens"),
             prompt_tokens=usage.get("prompt_tokens"),
             total_tokens=usage.get("total_tokens"),
-            assistant_message=choices.get("content"),
-            finish_reason=response_dump.get("choices", [{}])[0].get("finish_reason"),
-            tool_calls=choices.get("tool_calls"),
-            function_call=choices.get("function_call"),
+            assistant_message=message.get("content"),
+            finish_reason=choice.get("finish_reason"),
+            tool_calls=message.get("tool_calls"),
+            function_call=message.get("function_call"),
             raw_response=response_dump,
             **kwargs,
         )
@@ -106,6 +105,8 @@ def wrap_hf_client(
     tags: Optional[List[str]] = None,
     properties: Optional[Dict[str, Any]] = None,
     logging_rate: Optional[float] = 1,
+    batch_size: Optional[int] = 1,
+    flush_interval: Optional[float] = 5,
 ) -> Union["AsyncChatCompletionObserver", "ChatCompletionObserver"]:
     """
     Wraps Hugging Face's Inference Client in an observer.
@@ -121,6 +122,10 @@ def wrap_hf_client(
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store, defaults to 1
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered, defaults to 5
 
     Returns:
         `Union[AsyncChatCompletionObserver, ChatCompletionObserver]`:
@@ -129,12 +134,14 @@ def wrap_hf_client(
     observer_args = {
         "client": client,
         "create": client.chat.completions.create,
-        "format_input": lambda inputs, **kwargs: {"messages": inputs, **kwargs},
+        "format_input": None,
         "parse_response": HFRecord.from_response,
         "store": store,
         "tags": tags,
         "properties": properties,
         "logging_rate": logging_rate,
+        "batch_size": batch_size,
+        "flush_interval": flush_interval,
     }
     if isinstance(client, AsyncInferenceClient):
         return AsyncChatCompletionObserver(**observer_args)
@@ -15,6 +15,7 @@ if TYPE_CHECKING:
 
 
 class LitellmRecord(OpenAIRecord):
+    __slots__ = ()
     client_name: str = "litellm"
 
 
@@ -24,6 +25,8 @@ def wrap_litellm(
     tags: Optional[List[str]] = None,
     properties: Optional[Dict[str, Any]] = None,
     logging_rate: Optional[float] = 1,
+    batch_size: Optional[int] = 1,
+    flush_interval: Optional[float] = 5,
 ) -> Union[AsyncChatCompletionObserver, ChatCompletionObserver]:
     """
     Wrap Litellm completion function to track API calls in a Store.
@@ -39,6 +42,10 @@ def wrap_litellm(
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store, defaults to 1
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered, defaults to 5
 
     Returns:
         `Union[AsyncChatCompletionObserver, ChatCompletionObserver]`:
@@ -47,12 +54,14 @@ def wrap_litellm(
     observer_args = {
         "client": client,
         "create": client,
-        "format_input": lambda inputs, **kwargs: {"messages": inputs, **kwargs},
+        "format_input": None,
         "parse_response": LitellmRecord.from_response,
         "store": store,
         "tags": tags,
         "properties": properties,
         "logging_rate": logging_rate,
+        "batch_size": batch_size,
+        "flush_interval": flush_interval,
     }
     if client.__name__ == "acompletion":
         return AsyncChatCompletionObserver(**observer_args)
@@ -1,9 +1,9 @@
-import uuid
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, MutableMapping, Optional, Union
 from observers.stores.duckdb import DuckDBStore
 from openai import AsyncOpenAI, OpenAI
 from typing_extensions import Self
 
+from observers.base import generate_id
 from observers.models.base import (
     AsyncChatCompletionObserver,
     ChatCompletionObserver,
@@ -17,75 +17,95 @@ if TYPE_CHECKING:
 
 
 class OpenAIRecord(ChatCompletionRecord):
+    __slots__ = ()
     client_name: str = "openai"
 
     @classmethod
     def from_response(
         cls,
         response: Union[List["ChatCompletionChunk"], "ChatCompletion"] = None,
-        error=None,
-        messages=None,
-        **kwargs,
+        error: Optional[Exception] = None,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        model: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        properties: Optional[Dict[str, Any]] = None,
+        arguments: Optional[Dict[str, Any]] = None,
     ) -> Self:
         """Create a response record from an API response or error"""
         if not response:
             return cls(
-                finish_reason="error", error=str(error), messages=messages, **kwargs
+                finish_reason="error",
+                error=str(error),
+                messages=messages,
+                model=model,
+                tags=tags,
+                properties=properties,
+                arguments=arguments,
             )
 
         # Handle streaming responses
         if isinstance(response, list):
-            first_dump = response[0].model_dump()
-            last_dump = response[-1].model_dump()
             content = ""
-
             completion_tokens = prompt_tokens = total_tokens = 0
 
-            choices = last_dump.get("choices", [{}])[0]
-            delta = choices.get("delta", {})
-
             raw_response = {}
             for i, r in enumerate(response):
                 r_dump = r.model_dump()
                 raw_response[i] = r_dump
-                content += (
-                    r_dump.get("choices", [{}])[0].get("delta", {}).get("content") or ""
-                )
+                r_choices = r_dump.get("choices")
+                if r_choices:
+                    content += (r_choices[0].get("delta") or {}).get("content") or ""
                 usage = r_dump.get("usage", {}) or {}
                 completion_tokens += usage.get("completion_tokens", 0)
                 prompt_tokens += usage.get("prompt_tokens", 0)
                 total_tokens += usage.get("total_tokens", 0)
 
+            first_dump = raw_response[0]
+            choice = (raw_response[len(response) - 1].get("choices") or [{}])[0]
+            delta = choice.get("delta") or {}
+
             return cls(
-                id=first_dump.get("id") or str(uuid.uuid4()),
+                id=first_dump.get("id") or generate_id(),
                 messages=messages,
                 completion_tokens=completion_tokens,
                 prompt_tokens=prompt_tokens,
                 total_tokens=total_tokens,
                 assistant_message=content,
-                finish_reason=choices.get("finish_reason"),
+                finish_reason=choice.get("finish_reason"),
                 tool_calls=delta.get("tool_calls"),
                 function_call=delta.get("function_call"),
                 raw_response=raw_response,
-                **kwargs,
+                model=model,
+                tags=tags,
+                properties=properties,
+                arguments=arguments,
             )
 
         # Handle non-streaming responses
-        response_dump = response.model_dump()
-        choices = response_dump.get("choices", [{}])[0].get("message", {})
-        usage = response_dump.get("usage", {}) or {}
+        choice = response.choices[0] if response.choices else None
+        message = choice.message if choice else None
+        usage = response.usage
+        tool_calls = getattr(message, "tool_calls", None)
+        function_call = getattr(message, "function_call", None)
         return cls(
-            id=response.id or str(uuid.uuid4()),
+            id=response.id or generate_id(),
             messages=messages,
-            completion_tokens=usage.get("completion_tokens"),
-            prompt_tokens=usage.get("prompt_tokens"),
-            total_tokens=usage.get("total_tokens"),
-            assistant_message=choices.get("content"),
-            finish_reason=response_dump.get("choices", [{}])[0].get("finish_reason"),
-            tool_calls=choices.get("tool_calls"),
-            function_call=choices.get("function_call"),
-            raw_response=response_dump,
-            **kwargs,
+            completion_tokens=usage.completion_tokens if usage else None,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            total_tokens=usage.total_tokens if usage else None,
+            assistant_message=message.content if message else None,
+            finish_reason=choice.finish_reason if choice else None,
+            tool_calls=(
+                [tool_call.model_dump() for tool_call in tool_calls]
+                if tool_calls
+                else None
+            ),
+            function_call=function_call.model_dump() if function_call else None,
+            raw_response=response.model_dump_json(),
+            model=model,
+            tags=tags,
+            properties=properties,
+            arguments=arguments,
         )
 
 
@@ -95,6 +115,9 @@ def wrap_openai(
     tags: Optional[List[str]] = None,
     properties: Optional[Dict[str, Any]] = None,
     logging_rate: Optional[float] = 1,
+    batch_size: Optional[int] = 1,
+    flush_interval: Optional[float] = 5,
+    cache: Optional[MutableMapping[str, Any]] = None,
 ) -> Union[ChatCompletionObserver, AsyncChatCompletionObserver]:
     """
     Wraps an OpenAI client in an observer.
@@ -110,6 +133,12 @@ def wrap_openai(
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store, defaults to 1
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered, defaults to 5
+        cache (`MutableMapping[str, Any]`, *optional*):
+            A mapping used to cache non-streaming responses by request content
 
     Returns:
         `Union[ChatCompletionObserver, AsyncChatCompletionObserver]`:
@@ -118,12 +147,15 @@ def wrap_openai(
     observer_args = {
         "client": client,
         "create": client.chat.completions.create,
-        "format_input": lambda messages, **kwargs: kwargs | {"messages": messages},
+        "format_input": None,
         "parse_response": OpenAIRecord.from_response,
         "store": store,
         "tags": tags,
         "properties": properties,
         "logging_rate": logging_rate,
+        "batch_size": batch_size,
+        "flush_interval": flush_interval,
+        "cache": cache,
     }
     if isinstance(client, AsyncOpenAI):
         return AsyncChatCompletionObserver(**observer_args)
@@ -1,6 +1,6 @@
-import uuid
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
+from observers.base import generate_id
 from observers.models.base import (
     ChatCompletionObserver,
     ChatCompletionRecord,
@@ -18,6 +18,7 @@ class TransformersRecord(ChatCompletionRecord):
     Data class for storing transformer records.
     """
 
+    __slots__ = ()
     client_name: str = "transformers"
 
     @classmethod
@@ -32,7 +33,7 @@ class TransformersRecord(ChatCompletionRecord):
             return cls(finish_reason="error", error=str(error), **kwargs)
         generated_text = response[0]["generated_text"][-1]
         return cls(
-            id=str(uuid.uuid4()),
+            id=generate_id(),
             assistant_message=generated_text.get("content"),
             tool_calls=generated_text.get("tool_calls"),
             raw_response=response,
@@ -46,6 +47,8 @@ def wrap_transformers(
     tags: Optional[List[str]] = None,
     properties: Optional[Dict[str, Any]] = None,
     logging_rate: Optional[float] = 1,
+    batch_size: Optional[int] = 1,
+    flush_interval: Optional[float] = 5,
 ) -> ChatCompletionObserver:
     """
     Wraps a transformers client in an observer.
@@ -61,6 +64,10 @@ def wrap_transformers(
             The properties to associate with records.
         logging_rate (`float`, *optional*):
             The logging rate to use for logging, defaults to 1
+        batch_size (`int`, *optional*):
+            The number of records to buffer before writing them to the store, defaults to 1
+        flush_interval (`float`, *optional*):
+            The maximum number of seconds records stay buffered, defaults to 5
 
     Returns:
         `ChatCompletionObserver`:
@@ -75,4 +82,6 @@ def wrap_transformers(
         tags=tags,
         properties=properties,
         logging_rate=logging_rate,
+        batch_size=batch_size,
+        flush_interval=flush_interval,
     )
@@ -1,3 +1,4 @@
+import json
 import uuid
 from dataclasses import asdict, dataclass, field
 from typing import TYPE_CHECKING, List, Optional, Union
@@ -107,6 +108,10 @@ class ArgillaStore(Store):
 
         record_dict = asdict(record)
 
+        for json_field in record.json_fields:
+            if isinstance(record_dict.get(json_field), str):
+                record_dict[json_field] = json.loads(record_dict[json_field])
+
         for text_field in record.text_fields:
             if text_field in record_dict:
                 record_dict[f"{text_field}_length"] = len(record_dict[text_field])
@@ -127,6 +132,10 @@ class ArgillaStore(Store):
 
         record_dict = asdict(record)
 
+        for json_field in record.json_fields:
+            if isinstance(record_dict.get(json_field), str):
+                record_dict[json_field] = json.loads(record_dict[json_field])
+
         for text_field in record.text_fields:
             if text_field in record_dict:
                 record_dict[f"{text_field}_length"] = len(record_dict[text_field])
@@ -1,11 +1,24 @@
+import atexit
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, ClassVar, List, Optional, Set
+
+import orjson
 
 
 if TYPE_CHECKING:
     from observers.base import Record
 
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def serialize_json_field(value: Any) -> Any:
+    """Serialize a JSON field value to JSON text, passing through empty values and
+    values that are already serialized"""
+    if not value or isinstance(value, str):
+        return value
+    return orjson.dumps(value, option=JSON_OPTIONS).decode()
+
 
 @dataclass
 class Store(ABC):
@@ -13,6 +26,9 @@ class Store(ABC):
     Base class for storing records
     """
 
+    # objects buffering records for the store, registered while they hold records
+    _producers: ClassVar[Optional[Set[Any]]] = None
+
     @abstractmethod
     def add(self, record: "Record"):
         """Add a new record to the store"""
@@ -23,6 +39,34 @@ class Store(ABC):
         """Add a new record to the store asynchronously"""
         pass
 
+    def add_many(self, records: List["Record"]):
+        """Add multiple records to the store"""
+        for record in records:
+            self.add(record)
+
+    async def add_many_async(self, records: List["Record"]):
+        """Add multiple records to the store asynchronously"""
+        for record in records:
+            await self.add_async(record)
+
+    def register_producer(self, producer: Any):
+        """Register an object buffering records for the store, its `flush` method is
+        called before the store is closed and at interpreter exit"""
+        if self._producers is None:
+            self._producers = set()
+            atexit.register(self.flush_producers)
+        self._producers.add(producer)
+
+    def unregister_producer(self, producer: Any):
+        """Unregister an object that no longer buffers records for the store"""
+        if self._producers:
+            self._producers.discard(producer)
+
+    def flush_producers(self):
+        """Write the records buffered by the registered producers to the store"""
+        for producer in list(self._producers or ()):
+            producer.flush()
+
     @abstractmethod
     def connect(self):
         """Connect to the store"""
@@ -1,20 +1,32 @@
 import asyncio
 import atexit
 import base64
+import gzip
 import hashlib
-import json
+import logging
 import os
+import shutil
 import tempfile
+import threading
 import uuid
-from dataclasses import asdict, dataclass, field
-from io import BytesIO
-from typing import TYPE_CHECKING, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Union
 
+import orjson
 from datasets.utils.logging import disable_progress_bar
-from huggingface_hub import CommitScheduler, login, metadata_update, whoami
+from huggingface_hub import (
+    CommitScheduler,
+    get_token,
+    login,
+    metadata_update,
+    whoami,
+)
 from PIL import Image
 
-from observers.stores.base import Store
+from observers.stores.base import JSON_OPTIONS, Store, serialize_json_field
 
 if TYPE_CHECKING:
     from observers.base import Record
@@ -22,6 +34,61 @@ if TYPE_CHECKING:
 
 disable_progress_bar()
 
+logger = logging.getLogger(__name__)
+
+# number of buffered records that triggers a flush before the flush interval elapses
+FLUSH_THRESHOLD = 1024
+
+# leading magic bytes of image formats that are written to disk as-is
+IMAGE_SIGNATURES = ((b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpg"))
+
+# number of recently written image hashes remembered to skip duplicate writes
+SEEN_IMAGES_SIZE = 4096
+
+# base64 characters decoded at a time
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# bytes outside the base64 alphabet, skipped like `base64.b64decode` does (e.g. the
+# line breaks of MIME base64)
+NON_BASE64_BYTES = bytes(
+    set(range(256))
+    - set(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+)
+
+# decoded images larger than this are spooled to disk instead of kept in memory
+SPOOL_MAX_SIZE = 1 << 20
+
+
+def _sniff_image_extension(image_bytes: bytes) -> Optional[str]:
+    """Return the file extension of already encoded PNG or JPEG bytes"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return extension
+    return None
+
+
+def _decode_base64_chunks(encoded: Union[str, bytes]) -> Iterator[bytes]:
+    """Decode base64 text chunk by chunk, carrying incomplete 4 character groups over
+    to the next chunk"""
+    remainder = b""
+    for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+        chunk = encoded[start : start + BASE64_CHUNK_SIZE]
+        if isinstance(chunk, str):
+            chunk = chunk.encode("ascii")
+        chunk = remainder + chunk.translate(None, NON_BASE64_BYTES)
+        complete = len(chunk) - len(chunk) % 4
+        remainder = chunk[complete:]
+        yield base64.b64decode(chunk[:complete])
+    if remainder:
+        # raises the same padding error as decoding the whole text at once
+        yield base64.b64decode(remainder)
+
+
+@lru_cache(maxsize=8)
+def _cached_whoami(token: Optional[str]) -> dict:
+    """Look up the account of a token once, it does not change during a run"""
+    return whoami(token=token)
+
 
 @dataclass
 class DatasetsStore(Store):
@@ -40,20 +107,39 @@ class DatasetsStore(Store):
     allow_patterns: Optional[List[str]] = field(default=None)
     ignore_patterns: Optional[List[str]] = field(default=None)
     squash_history: Optional[bool] = field(default=None)
+    flush_interval: Optional[float] = field(default=1.0)
 
     _filename: Optional[str] = field(default=None)
     _scheduler: Optional[CommitScheduler] = None
     _temp_dir: Optional[str] = field(default=None, init=False)
+    _pending: bytearray = field(default_factory=bytearray, init=False)
+    _pending_count: int = field(default=0, init=False)
+    _pending_lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _flush_lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _flush_event: threading.Event = field(default_factory=threading.Event, init=False)
+    _stop_event: threading.Event = field(default_factory=threading.Event, init=False)
+    _flush_thread: Optional[threading.Thread] = field(default=None, init=False)
+    _image_folder: Optional[Path] = field(default=None, init=False)
+    _seen_image_hashes: OrderedDict = field(default_factory=OrderedDict, init=False)
+    _seen_images_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False
+    )
+    _record_layouts: Dict[type, tuple] = field(default_factory=dict, init=False)
+    _fd: Optional[int] = field(default=None, init=False)
 
     def __post_init__(self):
         """Initialize the store and create temporary directory"""
         if self.ignore_patterns is None:
-            self.ignore_patterns = ["*.json"]
+            self.ignore_patterns = ["*.jsonl.gz"]
 
-        try:
-            whoami(token=self.token or os.getenv("HF_TOKEN"))
-        except Exception:
+        token = self.token or get_token()
+        if token is None:
             login()
+        else:
+            try:
+                _cached_whoami(token)
+            except Exception:
+                login()
 
         if self.folder_path is None:
             self._temp_dir = tempfile.mkdtemp(prefix="observers_dataset_")
@@ -62,22 +148,23 @@ class DatasetsStore(Store):
         else:
             os.makedirs(self.folder_path, exist_ok=True)
 
+        # registered before the commit scheduler's own exit push, so this runs after
+        # it and pushes the records that producers and the flusher still buffer
+        atexit.register(self._flush_at_exit)
+
     def _cleanup(self):
         """Clean up temporary directory on exit"""
         if self._temp_dir and os.path.exists(self._temp_dir):
-            import shutil
-
             shutil.rmtree(self._temp_dir)
 
     def _init_table(self, record: "Record"):
-        import logging
-
         logging.getLogger("huggingface_hub").setLevel(logging.ERROR)
 
         repo_name = self.repo_name or f"{record.table_name}_{uuid.uuid4().hex[:8]}"
-        org_name = self.org_name or whoami(token=self.token).get("name")
+        token = self.token or get_token()
+        org_name = self.org_name or _cached_whoami(token).get("name")
         repo_id = f"{org_name}/{repo_name}"
-        self._filename = f"{record.table_name}_{uuid.uuid4()}.json"
+        self._filename = f"{record.table_name}_{uuid.uuid4()}.jsonl.gz"
         self._scheduler = CommitScheduler(
             repo_id=repo_id,
             folder_path=self.folder_path,
@@ -99,6 +186,14 @@ class DatasetsStore(Store):
             token=self.token,
             overwrite=True,
         )
+        self._open_shard()
+
+        # buffered records are written by a background thread
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(
+            target=self._flush_worker, name="observers-datasets-flush", daemon=True
+        )
+        self._flush_thread.start()
 
     @classmethod
     def connect(
@@ -114,6 +209,7 @@ class DatasetsStore(Store):
         allow_patterns: Optional[List[str]] = None,
         ignore_patterns: Optional[List[str]] = None,
         squash_history: Optional[bool] = None,
+        flush_interval: Optional[float] = 1.0,
     ) -> "DatasetsStore":
         """Create a new store instance with optional custom path"""
         return cls(
@@ -128,73 +224,188 @@ class DatasetsStore(Store):
             allow_patterns=allow_patterns,
             ignore_patterns=ignore_patterns,
             squash_history=squash_history,
+            flush_interval=flush_interval,
         )
 
+    def _get_image_folder(self) -> Path:
+        """Get the image folder, creating it on first use"""
+        if self._image_folder is None:
+            image_folder = self._scheduler.folder_path / "images"
+            image_folder.mkdir(exist_ok=True)
+            self._image_folder = image_folder
+        return self._image_folder
+
+    def _save_image(self, encoded_image: Union[str, bytes]) -> Path:
+        """Save a base64 encoded image under its content hash, once per image"""
+        hasher = hashlib.blake2b(digest_size=16)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as image_file:
+            for chunk in _decode_base64_chunks(encoded_image):
+                hasher.update(chunk)
+                image_file.write(chunk)
+
+            content_hash = hasher.hexdigest()
+            with self._seen_images_lock:
+                image_path = self._seen_image_hashes.get(content_hash)
+                if image_path is not None:
+                    self._seen_image_hashes.move_to_end(content_hash)
+                    return image_path
+
+            image_folder = self._get_image_folder()
+            image_file.seek(0)
+            extension = _sniff_image_extension(image_file.read(8))
+            image_file.seek(0)
+            if extension:
+                image_path = image_folder / f"{content_hash}.{extension}"
+                with open(image_path, "wb") as f:
+                    shutil.copyfileobj(image_file, f)
+            else:
+                image_path = image_folder / f"{content_hash}.png"
+                # fast zlib level: the images are re-encoded, not archived
+                Image.open(image_file).save(image_path, format="PNG", compress_level=1)
+
+        # concurrent writes of a new image write identical bytes to the same file
+        with self._seen_images_lock:
+            self._seen_image_hashes[content_hash] = image_path
+            if len(self._seen_image_hashes) > SEEN_IMAGES_SIZE:
+                self._seen_image_hashes.popitem(last=False)
+        return image_path
+
+    def _serialize_record(self, record: "Record") -> bytes:
+        """Convert a record to a JSON line, saving its images to the image folder"""
+        layout = self._record_layouts.get(type(record))
+        if layout is None:
+            columns = record.table_columns
+            layout = (
+                tuple(columns),
+                tuple(f for f in record.json_fields if f in columns),
+                tuple(f for f in record.image_fields if f in columns),
+            )
+            self._record_layouts[type(record)] = layout
+        columns, json_fields, image_fields = layout
+
+        # project the record onto the table columns, without copying nested values
+        row = {col: getattr(record, col, None) for col in columns}
+
+        # Handle JSON fields, empty dictionaries are stored as null
+        for json_field in json_fields:
+            value = serialize_json_field(row[json_field])
+            row[json_field] = None if value == {} else value
+
+        # Handle image fields
+        for image_field in image_fields:
+            image = row[image_field]
+            if image:
+                # Save image and update record
+                image_path = self._save_image(image["bytes"])
+                row[image_field] = {**image, "path": str(image_path), "bytes": None}
+            elif image == {}:
+                row[image_field] = None
+
+        return orjson.dumps(row, option=JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
     def add(self, record: "Record"):
         """Add a new record to the database"""
+        self.add_many([record])
+
+    def add_many(self, records: List["Record"]):
+        """Buffer multiple records, they are written by the background flusher"""
+        if not records:
+            return
         if not self._scheduler:
-            self._init_table(record)
-
-        with self._scheduler.lock:
-            with (self._scheduler.folder_path / self._filename).open("a") as f:
-                record_dict = asdict(record)
-
-                # Handle JSON fields
-                for json_field in record.json_fields:
-                    if record_dict[json_field]:
-                        record_dict[json_field] = json.dumps(record_dict[json_field])
-
-                # Handle image fields
-                for image_field in record.image_fields:
-                    if record_dict[image_field]:
-                        image_folder = self._scheduler.folder_path / "images"
-                        image_folder.mkdir(exist_ok=True)
-
-                        # Generate unique filename based on record content
-                        filtered_dict = {
-                            k: v
-                            for k, v in sorted(record_dict.items())
-                            if k not in ["uri", image_field, "id"]
-                        }
-                        content_hash = hashlib.sha256(
-                            json.dumps(obj=filtered_dict, sort_keys=True).encode()
-                        ).hexdigest()
-                        image_path = image_folder / f"{content_hash}.png"
-
-                        # Save image and update record
-                        image_bytes = base64.b64decode(
-                            record_dict[image_field]["bytes"]
-                        )
-                        Image.open(BytesIO(image_bytes)).save(image_path)
-                        record_dict[image_field].update(
-                            {"path": str(image_path), "bytes": None}
-                        )
-
-                # Clean up empty dictionaries
-                record_dict = {
-                    k: None if v == {} else v for k, v in record_dict.items()
-                }
-                sorted_dict = {
-                    col: record_dict.get(col) for col in record.table_columns
-                }
-                try:
-                    f.write(json.dumps(sorted_dict) + "\n")
-                    f.flush()
-                except Exception:
-                    raise
+            self._init_table(records[0])
+
+        lines = [self._serialize_record(record) for record in records]
+        with self._pending_lock:
+            for line in lines:
+                self._pending += line
+            self._pending_count += len(lines)
+            if self._pending_count >= FLUSH_THRESHOLD:
+                self._flush_event.set()
+
+    def flush(self):
+        """Write all buffered records to the JSONL file with a single write"""
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, bytearray()
+                pending_count, self._pending_count = self._pending_count, 0
+
+            try:
+                # every flush appends a gzip member, readers decode them as one stream
+                data = memoryview(gzip.compress(pending, compresslevel=3))
+                with self._scheduler.lock:
+                    size = os.lseek(self._fd, 0, os.SEEK_END)
+                    try:
+                        while data:
+                            data = data[os.write(self._fd, data) :]
+                    except Exception:
+                        # drop the partial gzip member, the records are written again
+                        os.ftruncate(self._fd, size)
+                        raise
+            except Exception:
+                with self._pending_lock:
+                    self._pending[:0] = pending
+                    self._pending_count += pending_count
+                raise
+
+    def _open_shard(self):
+        """Open the JSONL shard once, flushes append to it without reopening it"""
+        path = self._scheduler.folder_path / self._filename
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _flush_worker(self):
+        """Periodically flush buffered records until the store is closed"""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception:
+                # the records stay buffered and are retried on the next flush
+                logger.exception(
+                    "Failed to write buffered records to %s", self._filename
+                )
+
+    def _stop_flusher(self):
+        """Stop the flusher, write the remaining records and close the shard"""
+        if self._flush_thread:
+            self._stop_event.set()
+            self._flush_event.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
 
     async def add_async(self, record: "Record"):
         """Add a new record to the database asynchronously"""
         await asyncio.to_thread(self.add, record)
 
+    async def add_many_async(self, records: List["Record"]):
+        """Add multiple records to the database asynchronously"""
+        await asyncio.to_thread(self.add_many, records)
+
+    def _flush_at_exit(self):
+        """Write the records buffered by producers and the flusher, then push them"""
+        self.flush_producers()
+        if self._scheduler:
+            self._stop_flusher()
+            self._scheduler.push_to_hub()
+
     async def close_async(self):
         """Close the dataset store asynchronously"""
+        await asyncio.to_thread(self.flush_producers)
         if self._scheduler:
+            await asyncio.to_thread(self._stop_flusher)
             await asyncio.to_thread(self._scheduler.__exit__, None, None, None)
             self._scheduler = None
 
     def close(self):
         """Close the dataset store synchronously"""
+        self.flush_producers()
         if self._scheduler:
+            self._stop_flusher()
             self._scheduler.__exit__(None, None, None)
             self._scheduler = None
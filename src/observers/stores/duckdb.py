@@ -1,14 +1,15 @@
 import asyncio
 import glob
-import json
 import os
 import re
+import threading
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import duckdb
 
+from observers.stores.base import serialize_json_field
 from observers.stores.sql_base import SQLStore
 
 if TYPE_CHECKING:
@@ -28,6 +29,7 @@ class DuckDBStore(SQLStore):
     )
     _tables: List[str] = field(default_factory=list)
     _conn: Optional[duckdb.DuckDBPyConnection] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
 
     def __post_init__(self):
         """Initialize database connection and table"""
@@ -52,43 +54,73 @@ class DuckDBStore(SQLStore):
         """Get all tables in the database"""
         return [table[0] for table in self._conn.execute("SHOW TABLES").fetchall()]
 
-    def add(self, record: "Record"):
-        """Add a new record to the database"""
-        if record.table_name not in self._tables:
-            self._init_table(record)
-
+    def _record_values(self, record: "Record") -> List[Any]:
+        """Convert a record to a list of values ordered by the table columns"""
         record_dict = asdict(record)
 
         for json_field in record.json_fields:
-            if record_dict[json_field]:
-                record_dict[json_field] = json.dumps(record_dict[json_field])
+            record_dict[json_field] = serialize_json_field(record_dict[json_field])
+
+        return [record_dict.get(k) for k in record.table_columns]
 
+    def _insert_query(self, record: "Record") -> str:
+        """Build the parametrized INSERT statement for the record's table"""
         placeholders = ", ".join(
             ["$" + str(i + 1) for i in range(len(record.table_columns))]
         )
+        return f"INSERT INTO {record.table_name} VALUES ({placeholders})"
 
-        # Sort record_dict based on table_columns order
-        if hasattr(record, "table_columns"):
-            sorted_dict = {k: record_dict[k] for k in record.table_columns}
-            record_dict = sorted_dict
-
-        self._conn.execute(
-            f"INSERT INTO {record.table_name} VALUES ({placeholders})",
-            [
-                record_dict[k] if k in record_dict else None
-                for k in record.table_columns
-            ],
-        )
+    def add(self, record: "Record"):
+        """Add a new record to the database"""
+        with self._lock:
+            if record.table_name not in self._tables:
+                self._init_table(record)
+
+            self._conn.execute(self._insert_query(record), self._record_values(record))
+
+    def add_many(self, records: List["Record"]):
+        """Add multiple records to the database in a single transaction"""
+        records_by_table: Dict[str, List["Record"]] = {}
+        for record in records:
+            records_by_table.setdefault(record.table_name, []).append(record)
+
+        # the connection is shared, so a concurrent batch must not commit or roll
+        # back this transaction
+        with self._lock:
+            for table_records in records_by_table.values():
+                if table_records[0].table_name not in self._tables:
+                    self._init_table(table_records[0])
+
+            self._conn.execute("BEGIN TRANSACTION")
+            try:
+                for table_records in records_by_table.values():
+                    self._conn.executemany(
+                        self._insert_query(table_records[0]),
+                        [self._record_values(record) for record in table_records],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                try:
+                    self._conn.execute("ROLLBACK")
+                except duckdb.Error:
+                    pass
+                raise
 
     async def add_async(self, record: "Record"):
         """Add a new record to the database asynchronously"""
         await asyncio.to_thread(self.add, record)
 
+    async def add_many_async(self, records: List["Record"]):
+        """Add multiple records to the database asynchronously"""
+        await asyncio.to_thread(self.add_many, records)
+
     def close(self) -> None:
         """Close the database connection"""
         if self._conn:
-            self._conn.close()
-            self._conn = None
+            self.flush_producers()
+            with self._lock:
+                self._conn.close()
+                self._conn = None
 
     def __enter__(self):
         return self
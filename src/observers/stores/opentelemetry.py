@@ -1,10 +1,12 @@
 # stdlib features
 import asyncio
 from dataclasses import dataclass
+from datetime import datetime
 from importlib.metadata import PackageNotFoundError, version
 from typing import Optional
 
 # Actual dependencies
+from grpc import Compression
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.resources import Resource
@@ -19,16 +21,17 @@ from observers.stores.base import Store
 def flatten_dict(d, prefix=""):
     """Flatten a python dictionary, turning nested keys into dotted keys"""
     flat = {}
-    for k, v in d.items():
-        if v:
-            if type(v) is dict:
-                if prefix:
-                    flat.extend(flatten_dict(v, f"{prefix}.{k}"))
-            else:
-                if prefix:
-                    flat[(f"{prefix}.{k}")] = v
+    stack = [(prefix, d)]
+    while stack:
+        current_prefix, current = stack.pop()
+        for k, v in current.items():
+            if v:
+                key = f"{current_prefix}.{k}" if current_prefix else k
+                if isinstance(v, dict):
+                    stack.append((key, v))
                 else:
-                    flat[k] = v
+                    flat[key] = v
+    return flat
 
 
 def get_version():
@@ -51,6 +54,29 @@ class OpenTelemetryStore(Store):
     root_span: Optional[Span] = None
     exporter: Optional[SpanExporter] = None
     namespace: str = "observers.dev/observers"
+    # Span batching, sized for one span per record rather than the SDK defaults
+    max_queue_size: int = 16384
+    schedule_delay_millis: float = 1000
+    max_export_batch_size: int = 4096
+    export_timeout_millis: float = 15000
+
+    # Record fields set as span attributes, split out to be easily edited if the
+    # record api changes
+    _DEFAULT_EVENT_FIELDS = (
+        "assistant_message",
+        "completion_tokens",
+        "total_tokens",
+        "prompt_tokens",
+        "finish_reason",
+        "tool_calls",
+        "function_call",
+        "tags",
+        "properties",
+        "error",
+        "model",
+        "timestamp",
+        "id",
+    )
 
     def __post_init__(self):
         if not self.tracer:
@@ -63,9 +89,16 @@ class OpenTelemetryStore(Store):
                 ),
             )
             if not self.exporter:
-                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
-            else:
-                provider.add_span_processor(BatchSpanProcessor(self.exporter))
+                self.exporter = OTLPSpanExporter(compression=Compression.Gzip)
+            provider.add_span_processor(
+                BatchSpanProcessor(
+                    self.exporter,
+                    max_queue_size=self.max_queue_size,
+                    schedule_delay_millis=self.schedule_delay_millis,
+                    max_export_batch_size=self.max_export_batch_size,
+                    export_timeout_millis=self.export_timeout_millis,
+                )
+            )
             trace.set_tracer_provider(provider)
             self.tracer = trace.get_tracer(self.namespace)
         if not self.root_span:
@@ -79,34 +112,18 @@ class OpenTelemetryStore(Store):
         """Add a new record to the store"""
         with trace.use_span(self.root_span):
             with self.tracer.start_as_current_span(f"{self.namespace}.add") as span:
-                # Split out to be easily edited if the record api changes
-                event_fields = [
-                    "assistant_message",
-                    "completion_tokens",
-                    "total_tokens",
-                    "prompt_tokens",
-                    "finish_reason",
-                    "tool_calls",
-                    "function_call",
-                    "tags",
-                    "properties",
-                    "error",
-                    "model",
-                    "timestamp",
-                    "id",
-                ]
-                for field in event_fields:
-                    data = record.__getattribute__(field)
-                    if data:
+                attributes = {}
+                for field in self._DEFAULT_EVENT_FIELDS:
+                    if data := getattr(record, field, None):
                         if type(data) is dict:
-                            intermediate = flatten_dict(data, field)
-                            for k, v in intermediate:
-                                span.set_attribute(k, v)
+                            attributes.update(flatten_dict(data, field))
+                        elif isinstance(data, datetime):
+                            attributes[field] = data.isoformat()
                         else:
-                            span.set_attribute(field, data)
+                            attributes[field] = data
                 # Special case for `messages` as it is a list of dicts
-                messages = [str(message) for message in record.messages]
-                span.set_attribute("messages", messages)
+                attributes["messages"] = [str(message) for message in record.messages]
+                span.set_attributes(attributes)
 
     @classmethod
     def connect(cls, tracer=None, root_span=None, namespace=None, exporter=None):
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, create_autospec
 import pytest
 
 from observers.stores.datasets import DatasetsStore
+from observers.stores.duckdb import DuckDBStore
 
 
 @pytest.fixture(autouse=True)
@@ -37,3 +38,21 @@ def mock_store(monkeypatch):
     )
 
     return store_mock
+
+
+@pytest.fixture
+def duckdb_store(tmp_path):
+    """DuckDB store backed by a temporary database file"""
+    store = DuckDBStore(path=str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def count_rows(duckdb_store):
+    """Count the rows of a table in the DuckDB store"""
+
+    def count(table_name="openai_records"):
+        return duckdb_store._execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+    return count
@@ -1,6 +1,7 @@
 import asyncio
 import os
 import uuid
+from functools import lru_cache
 from unittest.mock import MagicMock, create_autospec
 
 import pytest
@@ -33,6 +34,20 @@ def get_async_example_files() -> list[str]:
     return async_files
 
 
+@lru_cache(maxsize=None)
+def compile_example(example_path: str):
+    """Compile an example file once, it is executed in fresh globals for each test
+
+    Args:
+        example_path (str): Path to the example file
+
+    Returns:
+        CodeType: Compiled code of the example file
+    """
+    with open(example_path) as f:
+        return compile(f.read(), example_path, "exec")
+
+
 @pytest.fixture
 def mock_clients(monkeypatch):
     """Fixture providing mocked API clients"""
@@ -76,11 +91,8 @@ async def test_async_example_files(example_path, mock_clients):
     """Test that async example files execute without errors"""
     print(f"Executing async example: {os.path.basename(example_path)}")
 
-    with open(example_path) as f:
-        content = f.read()
-
     exec_globals = {}
-    exec(content, exec_globals)
+    exec(compile_example(example_path), exec_globals)
     async_functions = [
         f
         for f in exec_globals.values()
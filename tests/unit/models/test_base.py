@@ -0,0 +1,156 @@
+import copy
+import pickle
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from observers.models.base import AsyncChatCompletionObserver, ChatCompletionObserver
+from observers.models.openai import OpenAIRecord
+from observers.stores.duckdb import DuckDBStore
+
+
+def parse_response(response, error=None, **kwargs):
+    return OpenAIRecord(error=str(error) if error else None, **kwargs)
+
+
+def make_observer(store, **kwargs):
+    client = MagicMock(spec=[])
+    return ChatCompletionObserver(
+        client=client,
+        create=lambda **_: "response",
+        format_input=None,
+        parse_response=parse_response,
+        store=store,
+        **kwargs,
+    )
+
+
+def create(observer, n=1):
+    for _ in range(n):
+        observer.create(messages=[{"role": "user", "content": "Hi"}], model="gpt-4o")
+
+
+@pytest.mark.parametrize(
+    "roundtrip",
+    [copy.copy, copy.deepcopy, lambda record: pickle.loads(pickle.dumps(record))],
+)
+def test_record_copy_roundtrip(roundtrip):
+    """Test that records can be copied and pickled"""
+    record = OpenAIRecord(model="gpt-4o", tags=["tag"], properties={"key": "value"})
+    copied = roundtrip(record)
+
+    assert copied == record
+    assert copied.client_name == "openai"
+
+
+def test_records_are_written_in_batches(duckdb_store, count_rows):
+    """Test that records are written once a full batch is buffered"""
+    observer = make_observer(duckdb_store, batch_size=2, flush_interval=None)
+    create(observer, 3)
+
+    assert count_rows() == 2
+    assert len(observer._pending) == 1
+
+
+def test_failed_batch_write_is_retried(duckdb_store, count_rows):
+    """Test that a failing store write keeps the batch buffered and does not fail the
+    request that filled it"""
+    observer = make_observer(duckdb_store, batch_size=2, flush_interval=None)
+    with patch.object(duckdb_store, "add_many", side_effect=RuntimeError("down")):
+        create(observer, 2)
+
+    assert len(observer._pending) == 2
+    assert all(record.error is None for record in observer._pending)
+
+    observer.flush()
+    assert count_rows() == 2
+    assert observer._pending == []
+
+
+def test_records_are_flushed_after_interval(duckdb_store, count_rows):
+    """Test that a partial batch is written once the flush interval elapses"""
+    observer = make_observer(duckdb_store, batch_size=10, flush_interval=0.05)
+    create(observer)
+
+    deadline = time.monotonic() + 5
+    while duckdb_store._producers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert count_rows() == 1
+
+
+def test_exit_writes_buffered_records(duckdb_store, count_rows):
+    """Test that leaving the observer context writes its buffered records and
+    leaves a store passed in by the caller open"""
+    with make_observer(duckdb_store, batch_size=10, flush_interval=None) as observer:
+        create(observer, 3)
+
+    assert count_rows() == 3
+
+
+def test_close_closes_own_store(mock_store):
+    """Test that closing the observer closes the store it created"""
+    observer = make_observer(None, flush_interval=None)
+    observer.close()
+
+    mock_store.close.assert_called_once()
+
+
+def test_store_close_flushes_producers(tmp_path):
+    """Test that closing the store first writes the records buffered by observers"""
+    store = DuckDBStore(path=str(tmp_path / "store.db"))
+    observer = make_observer(store, batch_size=10, flush_interval=None)
+    create(observer, 3)
+    assert store._producers == {observer}
+
+    store.close()
+    assert observer._pending == []
+    assert not store._producers
+
+
+@pytest.mark.asyncio
+async def test_create_many_uses_cache(duckdb_store):
+    """Test that create_many sends duplicate conversations once and fills the cache"""
+    calls = []
+
+    async def create_fn(messages, **kwargs):
+        calls.append(messages)
+        return f"response {len(calls)}"
+
+    cache = {}
+    observer = AsyncChatCompletionObserver(
+        client=MagicMock(spec=[]),
+        create=create_fn,
+        format_input=None,
+        parse_response=parse_response,
+        store=duckdb_store,
+        cache=cache,
+    )
+    hello = [{"role": "user", "content": "Hello"}]
+    bye = [{"role": "user", "content": "Bye"}]
+
+    responses = await observer.create_many([hello, bye, hello], model="gpt-4o")
+    assert len(calls) == 2
+    assert responses[0] == responses[2]
+    assert len(cache) == 2
+
+    assert await observer.create_many([bye], model="gpt-4o") == [responses[1]]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [0, -1])
+async def test_create_many_rejects_invalid_concurrency(duckdb_store, concurrency):
+    """Test that create_many fails fast instead of waiting on a semaphore that is
+    never released"""
+    observer = AsyncChatCompletionObserver(
+        client=MagicMock(spec=[]),
+        create=MagicMock(),
+        format_input=None,
+        parse_response=parse_response,
+        store=duckdb_store,
+    )
+    with pytest.raises(ValueError, match="concurrency"):
+        await observer.create_many(
+            [[{"role": "user", "content": "Hi"}]], concurrency=concurrency
+        )
@@ -1,9 +1,46 @@
+import base64
+import gzip
+import json
 import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
 import pytest
-from unittest.mock import patch
+from PIL import Image
+from unittest.mock import MagicMock, patch
+from observers.models.base import ChatCompletionObserver
+from observers.models.openai import OpenAIRecord
 from observers.stores.datasets import DatasetsStore
 
 
+@dataclass
+class ImageRecord(OpenAIRecord):
+    """OpenAI record with an image field"""
+
+    image: Optional[Dict[str, Any]] = None
+
+    @property
+    def table_columns(self):
+        return super().table_columns + ["image"]
+
+    @property
+    def image_fields(self):
+        return ["image"]
+
+
+def encode_image(format: str) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (4, 4), color="red").save(buffer, format=format)
+    return buffer.getvalue()
+
+
 @pytest.fixture
 def mock_whoami():
     with patch("observers.stores.datasets.whoami") as mock:
@@ -57,3 +94,222 @@ def test_custom_folder_path(mock_whoami, mock_login, tmp_path):
     assert os.path.exists(
         custom_path
     ), "Custom folder should not be deleted during cleanup"
+
+
+@pytest.fixture
+def scheduled_store(datasets_store):
+    """Datasets store with a local stand-in for the commit scheduler"""
+    datasets_store._scheduler = SimpleNamespace(
+        lock=threading.Lock(), folder_path=Path(datasets_store.folder_path)
+    )
+    datasets_store._filename = "openai_records_test.jsonl.gz"
+    datasets_store._open_shard()
+    yield datasets_store
+    datasets_store._stop_flusher()
+    datasets_store._scheduler = None
+
+
+def read_rows(store):
+    with gzip.open(Path(store.folder_path) / store._filename, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_add_writes_json_line(scheduled_store):
+    """Test that records are appended as JSON lines in table column order"""
+    record = OpenAIRecord(model="gpt-4o", properties={"key": "value"})
+    scheduled_store.add(record)
+    scheduled_store.flush()
+
+    (row,) = read_rows(scheduled_store)
+    assert list(row) == record.table_columns
+    assert row["id"] == record.id
+    assert row["timestamp"] == record.timestamp.isoformat()
+    assert json.loads(row["properties"]) == {"key": "value"}
+
+
+def test_empty_dict_fields_are_written_as_null(scheduled_store):
+    """Test that empty JSON and image fields are stored as null"""
+    scheduled_store.add(ImageRecord(model="gpt-4o", properties={}, image={}))
+    scheduled_store.flush()
+
+    (row,) = read_rows(scheduled_store)
+    assert row["properties"] is None
+    assert row["image"] is None
+
+
+def test_add_many_writes_all_records(scheduled_store):
+    """Test that a batch of records is appended in order"""
+    records = [OpenAIRecord(model="gpt-4o") for _ in range(3)]
+    scheduled_store.add_many(records)
+    scheduled_store.flush()
+
+    assert [row["id"] for row in read_rows(scheduled_store)] == [
+        record.id for record in records
+    ]
+
+
+def test_add_is_buffered_until_flush(scheduled_store):
+    """Test that records are only written to disk when the buffer is flushed"""
+    scheduled_store.add(OpenAIRecord(model="gpt-4o"))
+    assert read_rows(scheduled_store) == []
+
+    scheduled_store.flush()
+    assert len(read_rows(scheduled_store)) == 1
+
+
+def test_flushes_append_to_one_shard(scheduled_store):
+    """Test that consecutive flushes append readable gzip members to the shard"""
+    for _ in range(2):
+        scheduled_store.add(OpenAIRecord(model="gpt-4o"))
+        scheduled_store.flush()
+
+    assert len(read_rows(scheduled_store)) == 2
+
+
+def test_failed_flush_keeps_records(scheduled_store):
+    """Test that a failed write drops the partial gzip member and keeps the records"""
+    write = os.write
+
+    def partial_write(fd, data):
+        write(fd, data[:10])
+        raise OSError(28, "No space left on device")
+
+    scheduled_store.add_many([OpenAIRecord(model="gpt-4o") for _ in range(2)])
+    with patch("os.write", side_effect=partial_write):
+        with pytest.raises(OSError):
+            scheduled_store.flush()
+
+    scheduled_store.flush()
+    assert len(read_rows(scheduled_store)) == 2
+
+
+def test_flusher_survives_failed_writes(scheduled_store):
+    """Test that the background flusher keeps running after a failed write"""
+    scheduled_store.flush_interval = 0.01
+    scheduled_store._flush_thread = threading.Thread(
+        target=scheduled_store._flush_worker, daemon=True
+    )
+    with patch("os.write", side_effect=OSError(28, "No space left on device")):
+        scheduled_store._flush_thread.start()
+        scheduled_store.add(OpenAIRecord(model="gpt-4o"))
+        time.sleep(0.05)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with scheduled_store._flush_lock:
+            if not scheduled_store._pending:
+                break
+        time.sleep(0.01)
+    assert scheduled_store._flush_thread.is_alive()
+    assert len(read_rows(scheduled_store)) == 1
+
+
+def test_exit_flushes_producers_before_pushing(scheduled_store):
+    """Test that records buffered by an observer are written and pushed at exit"""
+    scheduled_store._scheduler.push_to_hub = MagicMock(
+        side_effect=lambda: rows.extend(read_rows(scheduled_store))
+    )
+    rows = []
+    observer = ChatCompletionObserver(
+        client=MagicMock(spec=[]),
+        create=lambda **_: None,
+        format_input=None,
+        parse_response=lambda response, error=None, **kwargs: OpenAIRecord(**kwargs),
+        store=scheduled_store,
+        batch_size=10,
+        flush_interval=None,
+    )
+    for _ in range(3):
+        observer.create(messages=[{"role": "user", "content": "Hi"}], model="gpt-4o")
+
+    scheduled_store._flush_at_exit()
+    assert len(rows) == 3
+
+
+def test_login_without_token(mock_whoami, mock_login, monkeypatch):
+    """Test that a missing token triggers a login without a whoami request"""
+    monkeypatch.setattr("observers.stores.datasets.get_token", lambda: None)
+    store = DatasetsStore()
+
+    mock_login.assert_called_once()
+    mock_whoami.assert_not_called()
+    store._cleanup()
+
+
+@pytest.mark.parametrize("format,extension", [("PNG", "png"), ("JPEG", "jpg")])
+def test_encoded_image_is_written_as_is(scheduled_store, format, extension):
+    """Test that PNG and JPEG images are stored without being re-encoded"""
+    image_bytes = encode_image(format)
+    record = ImageRecord(
+        model="gpt-4o", image={"bytes": base64.b64encode(image_bytes).decode()}
+    )
+    scheduled_store.add(record)
+    scheduled_store.flush()
+
+    (row,) = read_rows(scheduled_store)
+    assert row["image"]["bytes"] is None
+    assert row["image"]["path"].endswith(f".{extension}")
+    assert Path(row["image"]["path"]).read_bytes() == image_bytes
+    assert record.image["bytes"] is not None, "the record itself is left untouched"
+
+
+def test_other_image_formats_are_saved_as_png(scheduled_store):
+    """Test that images in other formats are re-encoded as PNG"""
+    record = ImageRecord(
+        model="gpt-4o", image={"bytes": base64.b64encode(encode_image("BMP")).decode()}
+    )
+    scheduled_store.add(record)
+    scheduled_store.flush()
+
+    (row,) = read_rows(scheduled_store)
+    assert row["image"]["path"].endswith(".png")
+    assert Image.open(row["image"]["path"]).format == "PNG"
+
+
+def test_identical_images_are_written_once(scheduled_store):
+    """Test that records sharing an image point to a single file written once"""
+    image = {"bytes": base64.b64encode(encode_image("PNG")).decode()}
+    records = [ImageRecord(model="gpt-4o", image=dict(image)) for _ in range(3)]
+
+    with patch("shutil.copyfileobj", wraps=shutil.copyfileobj) as copyfileobj:
+        scheduled_store.add_many(records)
+    scheduled_store.flush()
+
+    copyfileobj.assert_called_once()
+    assert len({row["image"]["path"] for row in read_rows(scheduled_store)}) == 1
+
+
+def test_concurrent_image_writes(scheduled_store, monkeypatch):
+    """Test that images can be saved from several threads while hashes are evicted"""
+    monkeypatch.setattr("observers.stores.datasets.SEEN_IMAGES_SIZE", 1)
+    images = [
+        base64.b64encode(encode_image(format)).decode() for format in ("PNG", "JPEG")
+    ]
+
+    def add(i):
+        scheduled_store.add(ImageRecord(model="gpt-4o", image={"bytes": images[i % 2]}))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(add, range(200)))
+    scheduled_store.flush()
+
+    assert len({row["image"]["path"] for row in read_rows(scheduled_store)}) == 2
+
+
+@pytest.mark.parametrize("encode", [base64.b64encode, base64.encodebytes])
+@pytest.mark.parametrize("chunk_size", [8, 1000])
+def test_large_image_is_decoded_in_chunks(
+    scheduled_store, monkeypatch, encode, chunk_size
+):
+    """Test that images spanning several base64 chunks are decoded intact, including
+    MIME base64 with line breaks"""
+    monkeypatch.setattr("observers.stores.datasets.BASE64_CHUNK_SIZE", chunk_size)
+    buffer = BytesIO()
+    Image.frombytes("RGB", (64, 64), os.urandom(64 * 64 * 3)).save(buffer, "PNG")
+    image_bytes = buffer.getvalue()
+    record = ImageRecord(model="gpt-4o", image={"bytes": encode(image_bytes).decode()})
+    scheduled_store.add(record)
+    scheduled_store.flush()
+
+    (row,) = read_rows(scheduled_store)
+    assert Path(row["image"]["path"]).read_bytes() == image_bytes
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from observers.models.openai import OpenAIRecord
+
+
+def test_add(duckdb_store, count_rows):
+    """Test that a single record is inserted"""
+    record = OpenAIRecord(model="gpt-4o", properties={"key": "value"})
+    duckdb_store.add(record)
+
+    assert count_rows(record.table_name) == 1
+
+
+def test_add_many(duckdb_store, count_rows):
+    """Test that multiple records are inserted in a single batch"""
+    records = [OpenAIRecord(model="gpt-4o", tags=["batch"]) for _ in range(5)]
+    duckdb_store.add_many(records)
+
+    assert count_rows(records[0].table_name) == 5
+
+
+def test_add_many_rolls_back_on_error(duckdb_store, count_rows):
+    """Test that a failing batch does not leave partially inserted records"""
+    record = OpenAIRecord(model="gpt-4o")
+    duplicate = OpenAIRecord(id=record.id, model="gpt-4o")
+
+    with pytest.raises(Exception):
+        duckdb_store.add_many([record, duplicate])
+
+    assert count_rows(record.table_name) == 0
+
+
+def test_concurrent_add_many(duckdb_store, count_rows):
+    """Test that batches written from several threads are all committed"""
+    batches = [[OpenAIRecord(model="gpt-4o") for _ in range(10)] for _ in range(20)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(duckdb_store.add_many, batches))
+
+    assert count_rows(batches[0][0].table_name) == 200
+
+
+def test_add_serialized_json_field(duckdb_store):
+    """Test that JSON fields holding JSON text are stored without re-encoding"""
+    record = OpenAIRecord(model="gpt-4o", raw_response='{"id": "chatcmpl-123"}')
+    duckdb_store.add(record)
+
+    raw_id = duckdb_store._execute(
+        f"SELECT raw_response->>'id' FROM {record.table_name}"
+    ).fetchone()[0]
+    assert raw_id == "chatcmpl-123"
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("opentelemetry.exporter.otlp.proto.grpc")
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from observers.models.openai import OpenAIRecord
+from observers.stores.opentelemetry import OpenTelemetryStore, flatten_dict
+
+
+@pytest.fixture
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture
+def otel_store(exporter):
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return OpenTelemetryStore(tracer=provider.get_tracer("test"))
+
+
+def added_span_attributes(exporter):
+    (span,) = [
+        span for span in exporter.get_finished_spans() if span.name.endswith(".add")
+    ]
+    return span.attributes
+
+
+def test_add_sets_record_attributes(otel_store, exporter):
+    """Test that record fields are set as attributes of the add span"""
+    record = OpenAIRecord(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": "Hello"}],
+        total_tokens=3,
+        tags=["test"],
+    )
+    otel_store.add(record)
+
+    attributes = added_span_attributes(exporter)
+    assert attributes["model"] == "gpt-4o"
+    assert attributes["total_tokens"] == 3
+    assert attributes["tags"] == ("test",)
+    assert attributes["timestamp"] == record.timestamp.isoformat()
+    assert attributes["messages"] == (str({"role": "user", "content": "Hello"}),)
+
+
+def test_flatten_dict():
+    """Test that nested keys are joined with dots and empty values are dropped"""
+    nested = {"a": 1, "b": {"c": "x", "d": {"e": True}}, "f": None, "g": {}}
+
+    assert flatten_dict(nested) == {"a": 1, "b.c": "x", "b.d.e": True}
+    assert flatten_dict({"key": "value"}, "properties") == {"properties.key": "value"}
+
+
+def test_add_flattens_dict_fields(otel_store, exporter):
+    """Test that dict fields are set as dotted attributes"""
+    record = OpenAIRecord(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": "Hello"}],
+        properties={"user": {"id": "u1"}, "n": 2},
+    )
+    otel_store.add(record)
+
+    attributes = added_span_attributes(exporter)
+    assert attributes["properties.user.id"] == "u1"
+    assert attributes["properties.n"] == 2
+
+
+def test_batch_span_processor_settings(exporter, monkeypatch):
+    """Test that the span batching settings are passed to the span processor"""
+    monkeypatch.setattr(
+        "observers.stores.opentelemetry.trace.set_tracer_provider", lambda _: None
+    )
+    with patch("observers.stores.opentelemetry.BatchSpanProcessor") as processor:
+        OpenTelemetryStore(exporter=exporter, max_export_batch_size=64)
+
+    processor.assert_called_once_with(
+        exporter,
+        max_queue_size=16384,
+        schedule_delay_millis=1000,
+        max_export_batch_size=64,
+        export_timeout_millis=15000,
+    )